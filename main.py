@@ -1,6 +1,65 @@
 import argparse
+import os
+import sys
+import time
+
 import yaml
-from scripts.create_site import create_site
+from scripts.apply_changes import apply_inventory
+from utils.state_utils import DEFAULT_STATE_DIR
+
+
+def run(args):
+    """
+    Читает inventory и применяет его.
+    :return: True, если inventory применен без ошибок.
+    """
+    # Читаем YAML файл с параметрами
+    with open(args.config_file, "r") as file:
+        config = yaml.safe_load(file)
+
+    try:
+        # Применяем inventory целиком или только изменения с прошлого запуска
+        if apply_inventory(config, state_dir=args.state_dir, full=args.full):
+            print(f"Site '{config['site_name']}' with devices successfully applied!")
+            return True
+        print(f"Site '{config['site_name']}' was applied with errors, see the log above.")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    return False
+
+
+def watch(args):
+    # Опрашиваем mtime файла: без лишних зависимостей и одинаково на всех ОС
+    last_mtime = None
+    print(f"Watching '{args.config_file}' for changes, press Ctrl+C to stop.")
+    try:
+        while True:
+            try:
+                mtime = os.stat(args.config_file).st_mtime
+            except FileNotFoundError:
+                # Редакторы часто сохраняют файл через удаление и переименование
+                mtime = None
+            if mtime is not None and mtime != last_mtime:
+                last_mtime = mtime
+                try:
+                    applied = run(args)
+                except yaml.YAMLError as e:
+                    # Битый YAML повторно не читаем, ждем следующего сохранения
+                    print(f"Failed to parse '{args.config_file}': {e}")
+                except OSError as e:
+                    # Файл мог исчезнуть между stat и open, попробуем на следующей итерации
+                    print(f"Failed to read '{args.config_file}': {e}")
+                    last_mtime = None
+                else:
+                    if applied:
+                        # Полный проход нужен только до первого успешного применения
+                        args.full = False
+                    else:
+                        # Неудачное применение повторяем на следующей итерации
+                        last_mtime = None
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("Watch mode stopped.")
 
 
 def main():
@@ -8,25 +67,35 @@ def main():
         description="Provision new site and switches in NetBox"
     )
     parser.add_argument("config_file", help="Path to YAML configuration file")
+    parser.add_argument(
+        "--state-dir",
+        default=DEFAULT_STATE_DIR,
+        help=f"Directory with last applied inventories (default: {DEFAULT_STATE_DIR})",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore saved state and apply the whole inventory",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Re-apply inventory every time the file changes",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="Polling interval in seconds for --watch (default: 2)",
+    )
 
     # Получаем аргументы
     args = parser.parse_args()
 
-    # Читаем YAML файл с параметрами
-    with open(args.config_file, "r") as file:
-        config = yaml.safe_load(file)
-
-    try:
-        # Вызываем create_site с параметрами из YAML
-        create_site(
-            site_name=config["site_name"],
-            manufacturer_name=config["manufacturer_name"],
-            devices=config["devices"],
-            prefix=config["prefix"],
-        )
-        print(f"Site '{config['site_name']}' with devices successfully created!")
-    except Exception as e:
-        print(f"An error occurred: {e}")
+    if args.watch:
+        watch(args)
+    elif not run(args):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+import logging
+
+from scripts.create_site import apply_blocks, create_site
+from utils.object_utils import (create_or_get_manufacturer,
+                                create_or_get_prefix, create_or_get_site)
+from utils.state_utils import (diff_inventory, index_blocks, is_empty_diff,
+                               load_state, save_state)
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def apply_inventory(config, state_dir, full=False):
+    """
+    Применяет inventory сайта: полностью при первом запуске (или с full=True),
+    иначе только изменения относительно последнего успешно примененного состояния.
+    Количество уже созданных устройств всегда берется из NetBox, поэтому повтор
+    после упавшего запуска не создает дубликатов.
+    :param config: Inventory, прочитанный из YAML.
+    :param state_dir: Каталог с файлами состояния.
+    :param full: Игнорировать сохраненное состояние и пройти весь inventory.
+    :return: True, если все блоки применены без ошибок.
+    """
+    site_name = config["site_name"]
+    # Проверяем до любых запросов, в том числе для полного прохода
+    index_blocks(config["devices"])
+    state = load_state(state_dir, site_name)
+
+    if state is None or full:
+        devices = state["devices"] if state else {}
+        block_devices, failed = create_site(
+            site_name=site_name,
+            manufacturer_name=config["manufacturer_name"],
+            devices=config["devices"],
+            prefix=config["prefix"],
+        )
+        devices.update(block_devices)
+    else:
+        diff = diff_inventory(state["inventory"], config)
+        if is_empty_diff(diff):
+            logger.info(f"Inventory for site '{site_name}' has no changes, nothing to apply.")
+            return True
+        devices, failed = apply_diff(config, diff, state["devices"])
+
+    # Блоки с ошибками не считаем примененными: на следующем запуске они
+    # придут в diff как новые и будут пройдены и досинхронизированы целиком
+    applied = {
+        **config,
+        "devices": [block for block in config["devices"] if block["name_suffix"] not in failed],
+    }
+    save_state(state_dir, site_name, applied, devices)
+
+    if failed:
+        logger.error(
+            f"Blocks {', '.join(failed)} of site '{site_name}' were not fully applied, "
+            f"they will be re-applied on the next run."
+        )
+        return False
+    return True
+
+
+def apply_diff(config, diff, known_devices):
+    """
+    Применяет diff inventory, затрагивая только измененные блоки.
+    :param config: Новый inventory.
+    :param diff: Результат diff_inventory.
+    :param known_devices: Словарь {name_suffix: [имена устройств]} из состояния.
+        Для измененных блоков он перечитывается из NetBox.
+    :return: Кортеж (обновленный словарь устройств, [name_suffix блоков с ошибками]).
+    """
+    devices = {suffix: list(names) for suffix, names in known_devices.items()}
+
+    if diff["prefix_changed"]:
+        create_or_get_prefix(config["prefix"])
+
+    for block in diff["removed"]:
+        logger.warning(
+            f"Block '{block['name_suffix']}' was removed from inventory, "
+            f"its devices are left in NetBox untouched."
+        )
+
+    if not (diff["added"] or diff["changed"]):
+        return devices, []
+
+    site_id = create_or_get_site(config["site_name"])
+    manufacturer_id = create_or_get_manufacturer(config["manufacturer_name"])
+
+    blocks = [(block, None) for block in diff["added"]]
+    blocks += [(block_diff["block"], block_diff) for block_diff in diff["changed"]]
+    failed = apply_blocks(config["site_name"], site_id, manufacturer_id, blocks, devices)
+    return devices, failed
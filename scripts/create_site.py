@@ -1,42 +1,249 @@
+import logging
+
+from utils.api_utils import (get_existing_device_interfaces, get_object_id,
+                             update_object)
 from utils.object_utils import (allocate_ip_to_device_interface, create_device,
+                                create_device_type_templates,
                                 create_or_get_device_role,
-                                create_or_get_device_type,
+                                create_or_get_device_type_id,
                                 create_or_get_manufacturer,
                                 create_or_get_prefix, create_or_get_site,
-                                find_available_device_name)
+                                get_block_devices, get_interface_ip_id,
+                                pick_free_device_names)
+from utils.state_utils import diff_block
+from utils.utils import create_device_interfaces, update_interface_templates
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 
 def create_site(site_name, manufacturer_name, devices, prefix):
+    """
+    Полностью применяет inventory сайта.
+    Повторный запуск не дублирует устройства: создаются только недостающие до count,
+    а уже существующие досинхронизируются (интерфейсы, роль, недостающие IP).
+    :return: Кортеж ({name_suffix: [имена устройств блока]}, [name_suffix блоков с ошибками]).
+    """
     site_id = create_or_get_site(site_name)
     manufacturer_id = create_or_get_manufacturer(manufacturer_name)
     create_or_get_prefix(prefix)
+    block_devices = {}
     # Итерируемся по devices и разбираем на подзадачи все составляющие
-    for device in devices:
-        interfaces = device.get("interfaces")
-        subnet = device.get("subnet")
-        # создаем device_type
-        device_type_id = create_or_get_device_type(
-            manufacturer_id, device["model"], interfaces
+    failed = apply_blocks(
+        site_name, site_id, manufacturer_id, [(device, None) for device in devices], block_devices
+    )
+    return block_devices, failed
+
+
+def apply_blocks(site_name, site_id, manufacturer_id, blocks, devices):
+    """
+    Применяет блоки по очереди; ошибка в одном блоке не останавливает остальные.
+    :param blocks: Список пар (блок inventory, diff_block или None).
+    :param devices: Словарь {name_suffix: [имена устройств]}, обновляется на месте.
+    :return: Список name_suffix блоков, примененных с ошибками.
+    """
+    failed = []
+    for block, block_diff in blocks:
+        try:
+            ok = apply_block(site_name, site_id, manufacturer_id, block, block_diff, devices)
+        except Exception as e:
+            logger.error(f"Failed to apply block '{block['name_suffix']}': {e}")
+            ok = False
+        if not ok:
+            failed.append(block["name_suffix"])
+    return failed
+
+
+def apply_block(site_name, site_id, manufacturer_id, block, block_diff, devices):
+    """
+    Применяет один блок из секции devices.
+    :param block: Блок inventory.
+    :param block_diff: Результат diff_block или None, чтобы пройти блок целиком.
+    :param devices: Словарь {name_suffix: [имена устройств]}, обновляется на месте.
+    :return: True, если все шаги блока выполнены без ошибок.
+    """
+    suffix = block["name_suffix"]
+    # Состоянию не доверяем: прошлый запуск мог упасть после создания части устройств
+    existing_devices = get_block_devices(site_id, site_name, suffix)
+    devices[suffix] = list(existing_devices)
+    interfaces = block.get("interfaces") or []
+    device_type_id = None
+    role_id = None
+    ok = True
+
+    # Device type и шаблоны трогаем, только если они затронуты изменением
+    if block_diff is None or block_diff["model_changed"]:
+        templates = interfaces
+    else:
+        templates = block_diff["added_interfaces"]
+    if templates:
+        device_type_id = create_or_get_device_type_id(manufacturer_id, block["model"])
+        ok = create_device_type_templates(device_type_id, block["model"], templates) and ok
+
+    if block_diff is None or block_diff["role_changed"] or block_diff["role_color_changed"]:
+        role_id = create_or_get_device_role(block["role"], block["role_color"])
+        if block_diff and block_diff["role_color_changed"]:
+            # create_or_get не обновляет цвет у существующей роли
+            updated = update_object("dcim/device-roles", role_id, {"color": block["role_color"]})
+            ok = updated is not None and ok
+
+    # При смене модели новый device type уже создан со всеми актуальными шаблонами
+    retyped_interfaces = [
+        change["current"]
+        for change in (block_diff or {}).get("changed_interfaces", [])
+        if change["previous"].get("interface_type") != change["current"].get("interface_type")
+    ]
+    if retyped_interfaces and not block_diff["model_changed"]:
+        if device_type_id is None:
+            device_type_id = get_object_id(
+                "dcim/device-types", {"manufacturer_id": manufacturer_id, "model": block["model"]}
+            )
+        if device_type_id:
+            for iface in retyped_interfaces:
+                ok = update_interface_templates(
+                    device_type_id, iface["interface_range"], iface["interface_type"]
+                ) and ok
+        else:
+            logger.warning(f"Device type '{block['model']}' not found, templates are not updated.")
+            ok = False
+
+    if existing_devices:
+        # Полный проход досинхронизирует устройства, оставшиеся от прошлых запусков
+        ok = update_existing_devices(
+            block, block_diff or _resync_diff(block), existing_devices, role_id
+        ) and ok
+
+    missing = block["count"] - len(existing_devices)
+    if missing > 0:
+        if device_type_id is None:
+            device_type_id = create_or_get_device_type_id(manufacturer_id, block["model"])
+        if role_id is None:
+            role_id = create_or_get_device_role(block["role"], block["role_color"])
+        # Свободные индексы считаем по уже полученным именам, без запроса на каждый индекс
+        new_names = pick_free_device_names(site_name, suffix, devices[suffix], missing)
+        created_names, created_ok = create_devices(
+            site_name, site_id, block, device_type_id, role_id, new_names
         )
-        # Создаем device_role 
-        role_id = create_or_get_device_role(device["role"], device["role_color"])
-        # Собираем device name на основе suffix в ямле вида {site_name}-{suffix}-{index:02d}
-        device_names = find_available_device_name(
-            site_name, device["name_suffix"], device["count"]
+        devices[suffix].extend(created_names)
+        ok = created_ok and ok
+    elif missing < 0:
+        logger.warning(
+            f"Block '{suffix}' has {len(existing_devices)} devices in NetBox "
+            f"but count is {block['count']}, extra devices are left untouched."
         )
 
-        for device_name in device_names:
-            # Создаем устройство
-            device_id = create_device(device_name, device_type_id, role_id, site_id)
-            if device_id and subnet:
-                # Назначаем IP для всех виртуальных интерфейсов
-                for iface in interfaces:
-                    if iface["interface_type"] == "virtual" and iface["primary"] == True:
-                        allocate_ip_to_device_interface(
-                            device_id,
-                            iface["interface_range"],
-                            subnet,
-                            device=device_name,
-                            description=device_name,
-                            count=device["count"],
-                        )
+    return ok
+
+
+def _resync_diff(block):
+    # Все интерфейсы и primary IP блока как "добавленные", роль как "измененная", модель та же
+    resync = diff_block({"model": block["model"]}, block)
+    resync["role_color_changed"] = False
+    return resync
+
+
+def update_existing_devices(block, block_diff, existing_devices, role_id):
+    """
+    Доносит изменения блока до уже созданных устройств.
+    :param block: Блок inventory.
+    :param block_diff: Результат diff_block.
+    :param existing_devices: Словарь {имя: ID} ранее созданных устройств блока.
+    :param role_id: ID роли, если роль блока изменилась.
+    :return: True, если все изменения применены.
+    """
+    suffix = block["name_suffix"]
+    subnet = block.get("subnet")
+
+    if block_diff["model_changed"]:
+        logger.warning(f"Model of block '{suffix}' changed, existing devices keep their device type.")
+    if block_diff["subnet_changed"]:
+        logger.warning(f"Subnet of block '{suffix}' changed, existing IP addresses are not moved.")
+    for iface in block_diff["removed_interfaces"]:
+        logger.warning(
+            f"Interface '{iface.get('interface_range')}' was removed from block '{suffix}', "
+            f"existing interfaces are left untouched."
+        )
+    for change in block_diff["changed_interfaces"]:
+        previous, current = change["previous"], change["current"]
+        interface_range = current.get("interface_range")
+        if previous.get("interface_type") != current.get("interface_type"):
+            # Смена типа у живого интерфейса может сломать кабели и IP, руками надежнее
+            logger.warning(
+                f"Type of interface '{interface_range}' in block '{suffix}' changed, "
+                f"existing devices keep interface type '{previous.get('interface_type')}'."
+            )
+        if previous.get("primary") == True and current.get("primary") != True:
+            logger.warning(
+                f"Interface '{interface_range}' in block '{suffix}' is no longer primary, "
+                f"existing IP addresses are left untouched."
+            )
+
+    ip_interfaces = block_diff["added_ip_interfaces"] if subnet else []
+    if not (block_diff["added_interfaces"] or ip_interfaces or block_diff["role_changed"]):
+        return True
+
+    ok = True
+    for device_name, device_id in existing_devices.items():
+        if block_diff["added_interfaces"]:
+            device_interfaces = get_existing_device_interfaces(device_id)
+            if device_interfaces is None:
+                ok = False
+            else:
+                for iface in block_diff["added_interfaces"]:
+                    ok = create_device_interfaces(
+                        device_id, iface["interface_range"], iface["interface_type"], device_interfaces
+                    ) and ok
+
+        if block_diff["role_changed"]:
+            ok = update_object("dcim/devices", device_id, {"role": role_id}) is not None and ok
+
+        for iface in ip_interfaces:
+            if get_interface_ip_id(device_id, iface["interface_range"]):
+                # Адрес уже выдан прошлым запуском, второй не нужен
+                continue
+            ok = allocate_ip_to_device_interface(
+                device_id,
+                iface["interface_range"],
+                subnet,
+                device=device_name,
+                description=device_name,
+                count=1,
+            ) is not None and ok
+
+    return ok
+
+
+def create_devices(site_name, site_id, device, device_type_id, role_id, device_names):
+    """
+    Создает устройства одного блока inventory и назначает им IP.
+    :param device: Блок из секции devices inventory.
+    :param device_names: Свободные имена вида {site_name}-{suffix}-{index:02d}.
+    :return: Кортеж (имена созданных устройств, True если все устройства и IP созданы).
+    """
+    interfaces = device.get("interfaces") or []
+    subnet = device.get("subnet")
+    created_names = []
+    ok = True
+
+    for device_name in device_names:
+        # Создаем устройство
+        device_id = create_device(device_name, device_type_id, role_id, site_id)
+        if not device_id:
+            ok = False
+            continue
+        created_names.append(device_name)
+        if subnet:
+            # Назначаем IP для всех виртуальных интерфейсов
+            for iface in interfaces:
+                if iface["interface_type"] == "virtual" and iface.get("primary") == True:
+                    ip_id = allocate_ip_to_device_interface(
+                        device_id,
+                        iface["interface_range"],
+                        subnet,
+                        device=device_name,
+                        description=device_name,
+                        count=1,
+                    )
+                    ok = ip_id is not None and ok
+    return created_names, ok
@@ -0,0 +1,150 @@
+import ipaddress
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+import requests
+
+# Скрипты импортируют пакеты utils/scripts от корня репозитория
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import api_utils  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, text=""):
+        self.status_code = status_code
+        self._data = data
+        self.text = text
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}: {self.text}")
+
+
+class FakeNetBox:
+    """
+    NetBox в памяти: понимает только те эндпоинты и фильтры, которые использует проект,
+    и записывает каждый запрос в calls для подсчета.
+    """
+
+    def __init__(self):
+        self.objects = defaultdict(dict)
+        self.calls = []
+        self._failures = []
+        self._next_id = 1
+
+    # Управление из тестов
+
+    def fail_on(self, method, endpoint, skip=0, times=1):
+        """Следующие times запросов method к endpoint (после skip успешных) вернут 500."""
+        self._failures.append({"method": method, "endpoint": endpoint, "skip": skip, "times": times})
+
+    def requests_to(self, method, endpoint):
+        return [call for call in self.calls if call[0] == method and call[1] == endpoint]
+
+    def find(self, endpoint, **filters):
+        return self._filter(endpoint, filters)
+
+    def device_names(self, suffix):
+        return sorted(d["name"] for d in self.objects["dcim/devices"].values() if f"-{suffix}-" in d["name"])
+
+    def interface_ips(self, device_name, interface_name):
+        device = self.find("dcim/devices", name=device_name)[0]
+        return self.find("ipam/ip-addresses", device_id=device["id"], interface=interface_name)
+
+    # requests API
+
+    def get(self, url, headers=None, params=None):
+        endpoint, _ = self._parse(url)
+        self.calls.append(("GET", endpoint, dict(params or {})))
+        results = self._filter(endpoint, params or {})
+        return FakeResponse(200, {"count": len(results), "results": results})
+
+    def post(self, url, headers=None, json=None):
+        endpoint, _ = self._parse(url)
+        self.calls.append(("POST", endpoint, dict(json)))
+        if self._should_fail("POST", endpoint):
+            return FakeResponse(500, text="Internal Server Error")
+        if endpoint == "dcim/devices" and self._filter(endpoint, {"name": json["name"], "site_id": json["site"]}):
+            return FakeResponse(400, text="Device name must be unique per site.")
+        obj = dict(json, id=self._next_id)
+        self._next_id += 1
+        self.objects[endpoint][obj["id"]] = obj
+        if endpoint == "dcim/devices":
+            # Как и NetBox, раскладываем шаблоны интерфейсов на новое устройство
+            for template in self._filter("dcim/interface-templates", {"device_type_id": json["device_type"]}):
+                self.post(
+                    f"{api_utils.NETBOX_URL}/api/dcim/interfaces/",
+                    json={"device": obj["id"], "name": template["name"], "type": template["type"]},
+                )
+                self.calls.pop()
+        return FakeResponse(201, obj)
+
+    def patch(self, url, json=None, headers=None):
+        endpoint, object_id = self._parse(url)
+        self.calls.append(("PATCH", endpoint, dict(json, _id=object_id)))
+        if self._should_fail("PATCH", endpoint):
+            return FakeResponse(500, text="Internal Server Error")
+        obj = self.objects[endpoint][object_id]
+        obj.update(json)
+        return FakeResponse(200, obj)
+
+    # Внутренности
+
+    def _parse(self, url):
+        path = url[len(f"{api_utils.NETBOX_URL}/api/"):].strip("/")
+        parts = path.split("/")
+        if parts[-1].isdigit():
+            return "/".join(parts[:-1]), int(parts[-1])
+        return path, None
+
+    def _should_fail(self, method, endpoint):
+        for failure in self._failures:
+            if failure["method"] != method or failure["endpoint"] != endpoint or not failure["times"]:
+                continue
+            if failure["skip"]:
+                failure["skip"] -= 1
+                return False
+            failure["times"] -= 1
+            return True
+        return False
+
+    def _assigned_interface(self, ip):
+        return self.objects["dcim/interfaces"].get(ip.get("assigned_object_id"), {})
+
+    def _matches(self, endpoint, obj, key, value):
+        if key == "limit":
+            return True
+        if key == "name__isw":
+            return obj["name"].lower().startswith(value.lower())
+        if key == "parent":
+            address = ipaddress.ip_interface(obj["address"]).ip
+            return address in ipaddress.ip_network(value)
+        if endpoint == "ipam/ip-addresses" and key == "device_id":
+            return self._assigned_interface(obj).get("device") == value
+        if endpoint == "ipam/ip-addresses" and key == "interface":
+            return self._assigned_interface(obj).get("name") == value
+        if key.endswith("_id") and key != "assigned_object_id":
+            return obj.get(key[:-3]) == value
+        return obj.get(key) == value
+
+    def _filter(self, endpoint, filters):
+        return [
+            dict(obj)
+            for obj in self.objects[endpoint].values()
+            if all(self._matches(endpoint, obj, key, value) for key, value in filters.items())
+        ]
+
+
+@pytest.fixture
+def netbox(monkeypatch):
+    fake = FakeNetBox()
+    monkeypatch.setattr(api_utils.requests, "get", fake.get)
+    monkeypatch.setattr(api_utils.requests, "post", fake.post)
+    monkeypatch.setattr(api_utils.requests, "patch", fake.patch)
+    return fake
@@ -0,0 +1,158 @@
+import copy
+from pathlib import Path
+
+import pytest
+import yaml
+
+from scripts.apply_changes import apply_inventory
+from utils.state_utils import load_state
+
+INVENTORY = yaml.safe_load(
+    (Path(__file__).resolve().parent.parent / "inventory" / "inventory.yml").read_text()
+)
+
+
+@pytest.fixture
+def inventory():
+    return copy.deepcopy(INVENTORY)
+
+
+@pytest.fixture
+def applied(netbox, inventory, tmp_path):
+    """Сайт из примера inventory, уже примененный один раз."""
+    assert apply_inventory(inventory, tmp_path)
+    netbox.calls.clear()
+    return inventory
+
+
+def _block(inventory, suffix):
+    return next(b for b in inventory["devices"] if b["name_suffix"] == suffix)
+
+
+def _device_ids(netbox, suffix):
+    return {d["id"] for d in netbox.objects["dcim/devices"].values() if f"-{suffix}-" in d["name"]}
+
+
+def _touched_devices(netbox):
+    """ID устройств, которые упоминаются в запросах (фильтры, тела и PATCH-пути)."""
+    touched = set()
+    for method, endpoint, payload in netbox.calls:
+        for key in ("device", "device_id"):
+            if key in payload:
+                touched.add(payload[key])
+        if method == "PATCH" and endpoint == "dcim/devices":
+            touched.add(payload["_id"])
+    return touched
+
+
+def test_first_run_creates_site_and_saves_state(netbox, inventory, tmp_path):
+    assert apply_inventory(inventory, tmp_path)
+
+    assert netbox.device_names("swa") == ["msk-swa-01", "msk-swa-02"]
+    assert netbox.device_names("swd") == ["msk-swd-01"]
+    for name in ["msk-swa-01", "msk-swa-02", "msk-swd-01"]:
+        assert len(netbox.interface_ips(name, "vlan10")) == 1
+    assert load_state(tmp_path, "msk")["inventory"] == inventory
+
+
+def test_unchanged_inventory_sends_no_requests(netbox, applied, tmp_path):
+    assert apply_inventory(applied, tmp_path)
+
+    assert netbox.calls == []
+
+
+def test_count_bump_creates_only_missing_devices(netbox, applied, tmp_path):
+    _block(applied, "swa")["count"] = 3
+
+    assert apply_inventory(applied, tmp_path)
+
+    assert netbox.device_names("swa") == ["msk-swa-01", "msk-swa-02", "msk-swa-03"]
+    assert netbox.device_names("swd") == ["msk-swd-01"]
+    assert len(netbox.interface_ips("msk-swa-03", "vlan10")) == 1
+    # Одно чтение устройств блока, без перебора имен по одному
+    assert len(netbox.requests_to("GET", "dcim/devices")) == 1
+    assert netbox.requests_to("POST", "dcim/interface-templates") == []
+    assert not _touched_devices(netbox) & _device_ids(netbox, "swd")
+
+
+def test_retry_after_partial_first_run_creates_no_duplicates(netbox, inventory, tmp_path):
+    netbox.fail_on("POST", "dcim/devices", skip=1)
+
+    assert not apply_inventory(inventory, tmp_path)
+    assert netbox.device_names("swa") == ["msk-swa-01"]
+    assert "swa" not in {b["name_suffix"] for b in load_state(tmp_path, "msk")["inventory"]["devices"]}
+
+    assert apply_inventory(inventory, tmp_path)
+
+    assert netbox.device_names("swa") == ["msk-swa-01", "msk-swa-02"]
+    assert netbox.device_names("swd") == ["msk-swd-01"]
+    for name in ["msk-swa-01", "msk-swa-02"]:
+        assert len(netbox.interface_ips(name, "vlan10")) == 1
+
+
+def test_failed_ip_is_retried_on_next_run(netbox, applied, tmp_path):
+    _block(applied, "swa")["count"] = 3
+    netbox.fail_on("PATCH", "ipam/ip-addresses")
+
+    assert not apply_inventory(applied, tmp_path)
+    assert netbox.interface_ips("msk-swa-03", "vlan10") == []
+
+    assert apply_inventory(applied, tmp_path)
+
+    assert netbox.device_names("swa") == ["msk-swa-01", "msk-swa-02", "msk-swa-03"]
+    for name in ["msk-swa-01", "msk-swa-02", "msk-swa-03"]:
+        assert len(netbox.interface_ips(name, "vlan10")) == 1
+
+
+def test_added_interface_touches_only_its_block(netbox, applied, tmp_path):
+    swa_type = netbox.find("dcim/device-types", model="vIOS-a")[0]["id"]
+    swa_templates = netbox.find("dcim/interface-templates", device_type_id=swa_type)
+    _block(applied, "swd")["interfaces"].append(
+        {"interface_range": "vlan30", "interface_type": "virtual", "primary": True}
+    )
+
+    assert apply_inventory(applied, tmp_path)
+
+    swd_type = netbox.find("dcim/device-types", model="vIOS-d")[0]["id"]
+    assert netbox.find("dcim/interface-templates", device_type_id=swd_type, name="vlan30")
+    assert netbox.find("dcim/interface-templates", device_type_id=swa_type) == swa_templates
+    assert len(netbox.interface_ips("msk-swd-01", "vlan30")) == 1
+    assert not netbox.find("dcim/interfaces", name="vlan30", device=min(_device_ids(netbox, "swa")))
+    assert not _touched_devices(netbox) & _device_ids(netbox, "swa")
+
+
+def test_interface_retype_updates_templates_not_devices(netbox, applied, tmp_path):
+    _block(applied, "swa")["interfaces"][0]["interface_type"] = "10gbase-x-sfpp"
+
+    assert apply_inventory(applied, tmp_path)
+
+    swa_type = netbox.find("dcim/device-types", model="vIOS-a")[0]["id"]
+    template = netbox.find("dcim/interface-templates", device_type_id=swa_type, name="GigabitEthernet0/0")
+    assert template[0]["type"] == "10gbase-x-sfpp"
+    device_id = min(_device_ids(netbox, "swa"))
+    interface = netbox.find("dcim/interfaces", device_id=device_id, name="GigabitEthernet0/0")
+    assert interface[0]["type"] == "1000base-t"
+
+
+def test_subnet_added_gives_ips_to_existing_devices(netbox, inventory, tmp_path):
+    previous = copy.deepcopy(inventory)
+    del _block(previous, "swd")["subnet"]
+    assert apply_inventory(previous, tmp_path)
+    assert netbox.interface_ips("msk-swd-01", "vlan10") == []
+
+    assert apply_inventory(inventory, tmp_path)
+
+    assert len(netbox.interface_ips("msk-swd-01", "vlan10")) == 1
+
+
+def test_full_run_repairs_drift_without_duplicates(netbox, applied, tmp_path):
+    ip = netbox.interface_ips("msk-swa-02", "vlan10")[0]
+    del netbox.objects["ipam/ip-addresses"][ip["id"]]
+
+    assert apply_inventory(applied, tmp_path, full=True)
+
+    assert netbox.device_names("swa") == ["msk-swa-01", "msk-swa-02"]
+    assert netbox.device_names("swd") == ["msk-swd-01"]
+    for name in ["msk-swa-01", "msk-swa-02", "msk-swd-01"]:
+        assert len(netbox.interface_ips(name, "vlan10")) == 1
+    assert load_state(tmp_path, "msk")["devices"]["swa"] == ["msk-swa-01", "msk-swa-02"]
@@ -0,0 +1,60 @@
+import argparse
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def watch_args(tmp_path):
+    config_file = tmp_path / "inventory.yml"
+    config_file.write_text("site_name: msk\n")
+    return argparse.Namespace(
+        config_file=str(config_file), state_dir=str(tmp_path), full=True, interval=0
+    )
+
+
+def _run_watch(monkeypatch, args, outcomes, polls):
+    """Запускает watch с подмененным run: outcomes - результаты (или исключения) по вызовам."""
+    calls = []
+
+    def fake_run(run_args):
+        calls.append(run_args.full)
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    sleeps = []
+
+    def fake_sleep(_):
+        sleeps.append(1)
+        if len(sleeps) >= polls:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(main, "run", fake_run)
+    monkeypatch.setattr(main.time, "sleep", fake_sleep)
+    main.watch(args)
+    return calls
+
+
+def test_watch_retries_when_file_vanishes_before_open(monkeypatch, watch_args):
+    calls = _run_watch(
+        monkeypatch, watch_args, [FileNotFoundError("gone"), True], polls=3
+    )
+
+    assert calls == [True, True]
+    assert watch_args.full is False
+
+
+def test_watch_keeps_full_until_apply_succeeds(monkeypatch, watch_args):
+    calls = _run_watch(monkeypatch, watch_args, [False, True], polls=3)
+
+    assert calls == [True, True]
+    assert watch_args.full is False
+
+
+def test_watch_does_not_rerun_unchanged_file_after_success(monkeypatch, watch_args):
+    calls = _run_watch(monkeypatch, watch_args, [True], polls=3)
+
+    assert calls == [True]
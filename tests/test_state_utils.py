@@ -0,0 +1,178 @@
+import copy
+
+import pytest
+
+from utils.state_utils import diff_inventory, is_empty_diff, load_state, save_state
+
+INVENTORY = {
+    "site_name": "msk",
+    "manufacturer_name": "Cisco",
+    "prefix": "192.168.10.0/24",
+    "devices": [
+        {
+            "role": "access-switch",
+            "model": "vIOS-a",
+            "count": 2,
+            "name_suffix": "swa",
+            "role_color": "1da670",
+            "subnet": "192.168.10.0/24",
+            "interfaces": [
+                {"interface_range": "Gi0/[0-3]", "interface_type": "1000base-t"},
+                {"interface_range": "vlan10", "interface_type": "virtual", "primary": True},
+                {"interface_range": "vlan20", "interface_type": "virtual", "primary": False},
+            ],
+        },
+        {
+            "role": "destributed-switch",
+            "model": "vIOS-d",
+            "count": 1,
+            "name_suffix": "swd",
+            "role_color": "00ffff",
+            "subnet": "192.168.10.0/24",
+            "interfaces": [
+                {"interface_range": "Gi0/[0-3]", "interface_type": "1000base-t"},
+                {"interface_range": "vlan10", "interface_type": "virtual", "primary": True},
+            ],
+        },
+    ],
+}
+
+
+@pytest.fixture
+def current():
+    return copy.deepcopy(INVENTORY)
+
+
+def _block(inventory, suffix):
+    return next(b for b in inventory["devices"] if b["name_suffix"] == suffix)
+
+
+def _single_change(diff):
+    assert not diff["added"] and not diff["removed"]
+    assert len(diff["changed"]) == 1
+    return diff["changed"][0]
+
+
+def test_same_inventory_is_empty_diff(current):
+    assert is_empty_diff(diff_inventory(INVENTORY, current))
+
+
+@pytest.mark.parametrize("count", [3, 1])
+def test_count_change_touches_only_its_block(current, count):
+    _block(current, "swa")["count"] = count
+
+    change = _single_change(diff_inventory(INVENTORY, current))
+
+    assert change["block"]["name_suffix"] == "swa"
+    assert not change["model_changed"]
+    assert not change["added_interfaces"]
+    assert not change["changed_interfaces"]
+    assert not change["added_ip_interfaces"]
+
+
+def test_block_added_and_removed(current):
+    new_block = copy.deepcopy(_block(current, "swd"))
+    new_block["name_suffix"] = "swc"
+    current["devices"] = [_block(current, "swa"), new_block]
+
+    diff = diff_inventory(INVENTORY, current)
+
+    assert [b["name_suffix"] for b in diff["added"]] == ["swc"]
+    assert [b["name_suffix"] for b in diff["removed"]] == ["swd"]
+    assert diff["changed"] == []
+
+
+def test_interface_added(current):
+    vlan30 = {"interface_range": "vlan30", "interface_type": "virtual", "primary": True}
+    _block(current, "swd")["interfaces"].append(vlan30)
+
+    change = _single_change(diff_inventory(INVENTORY, current))
+
+    assert change["added_interfaces"] == [vlan30]
+    assert change["added_ip_interfaces"] == [vlan30]
+    assert change["removed_interfaces"] == []
+
+
+def test_interface_removed(current):
+    _block(current, "swa")["interfaces"].pop()
+
+    change = _single_change(diff_inventory(INVENTORY, current))
+
+    assert [i["interface_range"] for i in change["removed_interfaces"]] == ["vlan20"]
+    assert change["added_interfaces"] == []
+
+
+def test_interface_type_changed(current):
+    _block(current, "swa")["interfaces"][0]["interface_type"] = "10gbase-x-sfpp"
+
+    change = _single_change(diff_inventory(INVENTORY, current))
+
+    assert change["added_interfaces"] == [] and change["removed_interfaces"] == []
+    assert len(change["changed_interfaces"]) == 1
+    interface = change["changed_interfaces"][0]
+    assert interface["previous"]["interface_type"] == "1000base-t"
+    assert interface["current"]["interface_type"] == "10gbase-x-sfpp"
+
+
+def test_primary_set_adds_ip_interface(current):
+    _block(current, "swa")["interfaces"][2]["primary"] = True
+
+    change = _single_change(diff_inventory(INVENTORY, current))
+
+    assert [i["interface_range"] for i in change["added_ip_interfaces"]] == ["vlan20"]
+    assert len(change["changed_interfaces"]) == 1
+
+
+def test_primary_unset_is_reported_as_changed(current):
+    _block(current, "swa")["interfaces"][1]["primary"] = False
+
+    change = _single_change(diff_inventory(INVENTORY, current))
+
+    assert change["added_ip_interfaces"] == []
+    assert change["changed_interfaces"][0]["previous"]["primary"] is True
+    assert change["changed_interfaces"][0]["current"]["primary"] is False
+
+
+def test_subnet_added_gives_ips_to_all_primary_interfaces(current):
+    previous = copy.deepcopy(INVENTORY)
+    del _block(previous, "swa")["subnet"]
+
+    change = _single_change(diff_inventory(previous, current))
+
+    assert [i["interface_range"] for i in change["added_ip_interfaces"]] == ["vlan10"]
+    assert not change["subnet_changed"]
+
+
+def test_subnet_replaced_is_reported(current):
+    _block(current, "swa")["subnet"] = "192.168.20.0/24"
+
+    change = _single_change(diff_inventory(INVENTORY, current))
+
+    assert change["subnet_changed"]
+    assert change["added_ip_interfaces"] == []
+
+
+def test_manufacturer_change_marks_every_block_model_changed(current):
+    current["manufacturer_name"] = "Arista"
+
+    diff = diff_inventory(INVENTORY, current)
+
+    assert diff["manufacturer_changed"]
+    assert sorted(c["block"]["name_suffix"] for c in diff["changed"]) == ["swa", "swd"]
+    assert all(c["model_changed"] for c in diff["changed"])
+
+
+def test_state_round_trip(tmp_path):
+    devices = {"swa": ["msk-swa-01", "msk-swa-02"]}
+    assert load_state(tmp_path, "msk") is None
+
+    save_state(tmp_path, "msk", INVENTORY, devices)
+
+    assert load_state(tmp_path, "msk") == {"inventory": INVENTORY, "devices": devices}
+
+
+def test_duplicate_name_suffix_is_rejected(current):
+    current["devices"].append(copy.deepcopy(_block(current, "swa")))
+
+    with pytest.raises(ValueError, match="swa"):
+        diff_inventory(INVENTORY, current)
@@ -107,13 +107,16 @@ def create_interface(interface_name, interface_type, device_type_id):
     :param interface_name: Имя интерфейса.
     :param interface_type: Тип интерфейса.
     :param device_type_id: ID типа устройства.
+    :return: True, если интерфейс создан или уже существовал.
     """
     # Получить список существующих интерфейсов
     existing_interfaces = get_existing_interfaces(device_type_id)
+    if existing_interfaces is None:
+        return False
 
     if interface_name in existing_interfaces:
         logger.debug(f"Interface '{interface_name}' already exists, skipping.")
-        return
+        return True
 
     # Создание нового интерфейса
     interface_data = {
@@ -126,8 +129,10 @@ def create_interface(interface_name, interface_type, device_type_id):
 
     if response.status_code == 201:
         logger.info(f"Interface '{interface_name}' created successfully.")
+        return True
     else:
         logger.error(f"Failed to create interface: {response.status_code}, {response.text}")
+        return False
 
 
 def get_existing_interfaces(device_type_id):
@@ -148,12 +153,31 @@ def get_existing_interfaces(device_type_id):
         logger.error(f"Failed to fetch existing interfaces: {response.status_code}, {response.text}")
 
 
+def get_existing_device_interfaces(device_id):
+    """
+    Получает список существующих интерфейсов устройства.
+
+    :param device_id: ID устройства.
+    :return: Список имён существующих интерфейсов.
+    """
+    url = f"{NETBOX_URL}/api/dcim/interfaces/"
+    params = {"device_id": device_id, "limit": 0}
+    response = requests.get(url, headers=HEADERS, params=params)
+
+    if response.status_code == 200:
+        results = response.json().get('results', [])
+        return [iface['name'] for iface in results]
+    else:
+        logger.error(f"Failed to fetch device interfaces: {response.status_code}, {response.text}")
+
+
 def set_primary_ip(device_id, ip_id, ip_version="ipv4"):
     """
     Устанавливает основной IP-адрес для устройства.
     :param device_id: ID устройства.
     :param ip_id: ID IP-адреса.
     :param ip_version: Версия IP ('ipv4' или 'ipv6').
+    :return: True, если IP установлен.
     """
     # Определяем поле для обновления
     primary_ip_field = "primary_ip4" if ip_version == "ipv4" else "primary_ip6"
@@ -171,5 +195,7 @@ def set_primary_ip(device_id, ip_id, ip_version="ipv4"):
 
     if response.status_code == 200:
         logger.info(f"Primary IP for device ID {device_id} set to IP ID {ip_id}.")
+        return True
     else:
         print(f"Failed to set primary IP: {response.status_code}, {response.text}")
+        return False
@@ -1,5 +1,6 @@
 import ipaddress
 import logging
+import re
 
 from .api_utils import (
     set_primary_ip,
@@ -48,6 +49,12 @@ def create_or_get_manufacturer(manufacturer_name):
 
 
 def create_or_get_device_type(manufacturer_id, model_name, interfaces=[]):
+    device_type_id = create_or_get_device_type_id(manufacturer_id, model_name)
+    create_device_type_templates(device_type_id, model_name, interfaces)
+    return device_type_id
+
+
+def create_or_get_device_type_id(manufacturer_id, model_name):
     device_type_slug = _slugify(model_name)
     device_type_id = get_object_id(
         "dcim/device-types", {"manufacturer_id": manufacturer_id, "model": model_name}
@@ -67,6 +74,18 @@ def create_or_get_device_type(manufacturer_id, model_name, interfaces=[]):
     else:
         logger.info(f"Using existing device type '{model_name}' with ID: {device_type_id}")
 
+    return device_type_id
+
+
+def create_device_type_templates(device_type_id, model_name, interfaces):
+    """
+    Создает шаблоны интерфейсов для типа устройства.
+    :param device_type_id: ID типа устройства.
+    :param model_name: Модель, только для логов.
+    :param interfaces: Список интерфейсов из блока inventory.
+    :return: True, если все шаблоны созданы или уже существовали.
+    """
+    ok = True
     # Создаем интерфейсы для каждого типа, определенного в списке interfaces
     if interfaces:
         for interface in interfaces:
@@ -77,15 +96,17 @@ def create_or_get_device_type(manufacturer_id, model_name, interfaces=[]):
                     f"Invalid interface data: {interface}. "
                     f"Both 'interface_range' and 'interface_type' are required."
                 )
+                ok = False
                 continue
             try:
-                create_interface_templates(device_type_id, interface_range, interface_type)
+                ok = create_interface_templates(device_type_id, interface_range, interface_type) and ok
             except ValueError as e:
                 logger.error(f"Failed to create interfaces for range '{interface_range}': {e}")
+                ok = False
     else:
         logger.info(f"No interfaces provided for device type '{model_name}'.")
 
-    return device_type_id
+    return ok
  
 
 def create_or_get_device_role(role_name, color=None):
@@ -206,6 +227,57 @@ def find_available_device_name(site_name, suffix, count):
     return device_names
 
 
+def pick_free_device_names(site_name, suffix, existing_names, count):
+    """
+    Подбирает свободные имена устройств без запросов к NetBox.
+    :param existing_names: Имена устройств блока, уже полученные из NetBox.
+    :param count: Сколько имен нужно.
+    :return: Список имен вида {site_name}-{suffix}-{index:02d} с наименьшими свободными индексами.
+    """
+    taken = {name.lower() for name in existing_names}
+    device_names = []
+    index = 1
+    while len(device_names) < count:
+        device_name = f"{site_name}-{suffix}-{index:02d}"
+        if device_name.lower() not in taken:
+            device_names.append(device_name)
+        index += 1
+    return device_names
+
+
+def get_block_devices(site_id, site_name, suffix):
+    """
+    Получает уже созданные в NetBox устройства блока inventory одним запросом.
+    :param site_id: ID сайта.
+    :param site_name: Имя сайта.
+    :param suffix: name_suffix блока.
+    :return: Словарь {имя: ID}, отсортированный по имени вида {site_name}-{suffix}-{index:02d}.
+    """
+    name_prefix = f"{site_name}-{suffix}-"
+    results = api_get(
+        "dcim/devices", {"site_id": site_id, "name__isw": name_prefix, "limit": 0}
+    ).get("results", [])
+    # name__isw совпадает и с чужими именами вроде msk-swa-test, оставляем только индексы
+    name_pattern = re.compile(rf"{re.escape(name_prefix)}\d+", re.IGNORECASE)
+    return dict(
+        sorted(
+            (device["name"], device["id"])
+            for device in results
+            if name_pattern.fullmatch(device["name"])
+        )
+    )
+
+
+def get_interface_ip_id(device_id, interface_name):
+    """
+    Возвращает ID IP-адреса, уже назначенного на интерфейс устройства, или None.
+    Нужен, чтобы повторный запуск не выдавал интерфейсу второй адрес.
+    """
+    return get_object_id(
+        "ipam/ip-addresses", {"device_id": device_id, "interface": interface_name}
+    )
+
+
 def allocate_ip_to_device_interface(
     device_id, interface_name, subnet, device, description, count
 ):
@@ -215,8 +287,9 @@ def allocate_ip_to_device_interface(
     :param interface_name: Имя интерфейса устройства.
     :param subnet: Подсеть для поиска IP-адреса.
     :param description: Описание IP-адреса.
-    :return: ID созданного или назначенного IP-адреса.
+    :return: ID созданного или назначенного IP-адреса, None при ошибке.
     """
+    ip_id = None
     try:
         # Находим свободный IP в подсети
         free_ip_addresses = []
@@ -237,15 +310,19 @@ def allocate_ip_to_device_interface(
                 status="active",
             )
             # Назначаем IP интерфейсу
-            assign_ip_to_interface(ip_id, device_id, interface_name)
+            if not assign_ip_to_interface(ip_id, device_id, interface_name):
+                raise ValueError(f"Failed to assign IP ID {ip_id}")
 
             # Устанавливаем IP как основной для устройства
-            set_primary_ip(device_id, ip_id, ip_version="ipv4")
+            if not set_primary_ip(device_id, ip_id, ip_version="ipv4"):
+                raise ValueError(f"Failed to set IP ID {ip_id} as primary")
 
     except Exception as e:
         logger.error(f"Failed to allocate IP to interface '{interface_name}': {e}")
         return None
 
+    return ip_id
+
 
 def assign_ip_to_interface(ip_id, device_id, interface_name):
     """
@@ -253,6 +330,7 @@ def assign_ip_to_interface(ip_id, device_id, interface_name):
     :param ip_id: ID IP-адреса.
     :param device_id: ID устройства.
     :param interface_name: Имя интерфейса.
+    :return: Ответ API, если IP назначен, иначе None.
     """
     # Ищем интерфейс устройства
     interface_id = get_object_id(
@@ -281,3 +359,4 @@ def assign_ip_to_interface(ip_id, device_id, interface_name):
         logger.info(
             f"Assigned IP ID '{ip_id}' to interface '{interface_name}' (ID: {interface_id})"
         )
+    return response
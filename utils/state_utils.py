@@ -0,0 +1,166 @@
+import logging
+from pathlib import Path
+
+import yaml
+
+from .utils import _slugify
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = ".netbox_state"
+
+
+def _state_path(state_dir, site_name):
+    return Path(state_dir) / f"{_slugify(site_name)}.yml"
+
+
+def load_state(state_dir, site_name):
+    """
+    Загружает последнее успешно примененное состояние сайта.
+    :param state_dir: Каталог с файлами состояния.
+    :param site_name: Имя сайта.
+    :return: Словарь {'inventory': ..., 'devices': ...} или None, если сайт еще не применялся.
+    """
+    path = _state_path(state_dir, site_name)
+    if not path.exists():
+        return None
+
+    with open(path, "r") as file:
+        state = yaml.safe_load(file)
+
+    if not state or "inventory" not in state:
+        logger.warning(f"State file '{path}' is empty or corrupted, ignoring it.")
+        return None
+    state.setdefault("devices", {})
+    return state
+
+
+def save_state(state_dir, site_name, inventory, devices):
+    """
+    Сохраняет примененный inventory и имена созданных устройств.
+    Запись идет через временный файл, чтобы прерванный запуск не испортил состояние.
+    :param inventory: Примененный inventory.
+    :param devices: Словарь {name_suffix: [имена устройств]}.
+    """
+    path = _state_path(state_dir, site_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".yml.tmp")
+
+    with open(tmp_path, "w") as file:
+        yaml.safe_dump({"inventory": inventory, "devices": devices}, file, sort_keys=False)
+    tmp_path.replace(path)
+    logger.info(f"Saved state for site '{site_name}' to '{path}'")
+
+
+def index_blocks(blocks):
+    """
+    Индексирует блоки секции devices по name_suffix.
+    :param blocks: Список блоков inventory.
+    :return: Словарь {name_suffix: блок}.
+    """
+    indexed = {}
+    for block in blocks or []:
+        suffix = block["name_suffix"]
+        if suffix in indexed:
+            # Имена устройств строятся из suffix, два таких блока делят одни и те же устройства
+            raise ValueError(f"Duplicate name_suffix '{suffix}' in inventory devices.")
+        indexed[suffix] = block
+    return indexed
+
+
+def _index_interfaces(interfaces):
+    return {iface.get("interface_range"): iface for iface in interfaces or []}
+
+
+def _is_primary_ip_interface(iface):
+    return iface.get("interface_type") == "virtual" and iface.get("primary") == True
+
+
+def diff_block(previous, current, manufacturer_changed=False):
+    """
+    Сравнивает две версии одного блока из секции devices.
+    :param manufacturer_changed: Сменился производитель, device type блока нужно создать заново.
+    :return: Словарь с изменениями или None, если блок не изменился.
+    """
+    if previous == current and not manufacturer_changed:
+        return None
+
+    previous_interfaces = _index_interfaces(previous.get("interfaces"))
+    current_interfaces = _index_interfaces(current.get("interfaces"))
+
+    added_interfaces = [
+        iface for name, iface in current_interfaces.items() if name not in previous_interfaces
+    ]
+    removed_interfaces = [
+        iface for name, iface in previous_interfaces.items() if name not in current_interfaces
+    ]
+    # Тот же диапазон, но другой interface_type или primary
+    changed_interfaces = [
+        {"previous": previous_interfaces[name], "current": iface}
+        for name, iface in current_interfaces.items()
+        if name in previous_interfaces and previous_interfaces[name] != iface
+    ]
+    # Интерфейсы, которые стали primary: на них нужно выдать IP существующим устройствам.
+    # Если подсети раньше не было, IP не выдавались ни на один интерфейс.
+    subnet_added = not previous.get("subnet") and bool(current.get("subnet"))
+    added_ip_interfaces = [
+        iface
+        for name, iface in current_interfaces.items()
+        if _is_primary_ip_interface(iface)
+        and (subnet_added or not _is_primary_ip_interface(previous_interfaces.get(name, {})))
+    ]
+
+    return {
+        "block": current,
+        "model_changed": manufacturer_changed or previous.get("model") != current.get("model"),
+        "role_changed": previous.get("role") != current.get("role"),
+        "role_color_changed": previous.get("role_color") != current.get("role_color"),
+        # Добавление подсети покрыто added_ip_interfaces, переносить нечего
+        "subnet_changed": bool(previous.get("subnet"))
+        and previous.get("subnet") != current.get("subnet"),
+        "added_interfaces": added_interfaces,
+        "removed_interfaces": removed_interfaces,
+        "changed_interfaces": changed_interfaces,
+        "added_ip_interfaces": added_ip_interfaces,
+    }
+
+
+def diff_inventory(previous, current):
+    """
+    Строит структурный diff двух inventory одного сайта.
+    Блоки сопоставляются по name_suffix, так как он определяет имена устройств.
+    :param previous: Последний примененный inventory.
+    :param current: Новый inventory.
+    :return: Словарь с добавленными, удаленными и измененными блоками.
+    """
+    previous_blocks = index_blocks(previous.get("devices"))
+    current_blocks = index_blocks(current.get("devices"))
+
+    manufacturer_changed = previous.get("manufacturer_name") != current.get("manufacturer_name")
+    changed = []
+    for suffix, block in current_blocks.items():
+        if suffix not in previous_blocks:
+            continue
+        block_diff = diff_block(previous_blocks[suffix], block, manufacturer_changed)
+        if block_diff:
+            changed.append(block_diff)
+
+    return {
+        "prefix_changed": previous.get("prefix") != current.get("prefix"),
+        "manufacturer_changed": manufacturer_changed,
+        "added": [b for s, b in current_blocks.items() if s not in previous_blocks],
+        "removed": [b for s, b in previous_blocks.items() if s not in current_blocks],
+        "changed": changed,
+    }
+
+
+def is_empty_diff(diff):
+    return not (
+        diff["prefix_changed"]
+        or diff["manufacturer_changed"]
+        or diff["added"]
+        or diff["removed"]
+        or diff["changed"]
+    )
@@ -1,7 +1,9 @@
 import logging
 import re
 
-from .api_utils import create_interface
+from .api_utils import (create_interface, create_object,
+                        get_existing_device_interfaces, get_object_id,
+                        update_object)
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
@@ -20,12 +22,11 @@ def _slugify(name: str) -> str:
     return name.lower().replace(" ", "_")
 
 
-def create_interface_templates(device_type_id, interface_range, interface_type):
+def expand_interface_range(interface_range):
     """
-    Функция для создания интерфейсов по шаблону.
-    :param device_type_id: ID типа устройства, с которым будут связаны интерфейсы.
+    Разворачивает диапазон интерфейсов в список нормализованных имен.
     :param interface_range: Диапазон интерфейсов в виде строки (например, 'Gi1/0/[1-9]', 'vlan10', 'vlan[1-1200]').
-    :param interface_type: Тип интерфейса (например, Ethernet, SFP, VLAN).
+    :return: Список имен интерфейсов (например, ['GigabitEthernet1/0/1', ...]).
     """
     interfaces = []
 
@@ -69,10 +70,75 @@ def create_interface_templates(device_type_id, interface_range, interface_type):
             f"Expected formats: 'Gi1/0/[1-4]', 'vlan10', 'vlan [1-1200]', etc."
         )
 
+    return [normalize_interface_name(interface_name) for interface_name in interfaces]
+
+
+def create_interface_templates(device_type_id, interface_range, interface_type):
+    """
+    Функция для создания интерфейсов по шаблону.
+    :param device_type_id: ID типа устройства, с которым будут связаны интерфейсы.
+    :param interface_range: Диапазон интерфейсов в виде строки (например, 'Gi1/0/[1-9]', 'vlan10', 'vlan[1-1200]').
+    :param interface_type: Тип интерфейса (например, Ethernet, SFP, VLAN).
+    :return: True, если все интерфейсы созданы или уже существовали.
+    """
+    ok = True
     # Создание интерфейсов с нормализованными именами
-    for interface_name in interfaces:
-        normalized_name = normalize_interface_name(interface_name)
-        create_interface(normalized_name, interface_type, device_type_id)
+    for interface_name in expand_interface_range(interface_range):
+        ok = create_interface(interface_name, interface_type, device_type_id) and ok
+    return ok
+
+
+def update_interface_templates(device_type_id, interface_range, interface_type):
+    """
+    Меняет тип у шаблонов интерфейсов, недостающие шаблоны создает.
+    :param device_type_id: ID типа устройства.
+    :param interface_range: Диапазон интерфейсов (например, 'Gi0/[0-3]').
+    :param interface_type: Новый тип интерфейса (например, '10gbase-x-sfpp').
+    :return: True, если все шаблоны обновлены.
+    """
+    ok = True
+    for interface_name in expand_interface_range(interface_range):
+        template_id = get_object_id(
+            "dcim/interface-templates", {"device_type_id": device_type_id, "name": interface_name}
+        )
+        if template_id:
+            updated = update_object("dcim/interface-templates", template_id, {"type": interface_type})
+            ok = updated is not None and ok
+        else:
+            ok = create_interface(interface_name, interface_type, device_type_id) and ok
+    return ok
+
+
+def create_device_interfaces(device_id, interface_range, interface_type, existing_interfaces=None):
+    """
+    Создает интерфейсы на уже существующем устройстве.
+    Шаблоны NetBox применяются только при создании устройства, поэтому
+    интерфейсы, добавленные в inventory позже, нужно создавать отдельно.
+    :param device_id: ID устройства.
+    :param interface_range: Диапазон интерфейсов (например, 'Gi0/[0-3]', 'vlan30').
+    :param interface_type: Тип интерфейса (например, '1000base-t', 'virtual').
+    :param existing_interfaces: Уже полученные имена интерфейсов устройства, дополняется на месте.
+    :return: True, если все интерфейсы созданы или уже существовали.
+    """
+    # Один запрос на устройство вместо проверки каждого интерфейса
+    if existing_interfaces is None:
+        existing_interfaces = get_existing_device_interfaces(device_id)
+        if existing_interfaces is None:
+            return False
+
+    for interface_name in expand_interface_range(interface_range):
+        if interface_name in existing_interfaces:
+            logger.debug(f"Interface '{interface_name}' already exists on device ID {device_id}, skipping.")
+            continue
+        interface_data = {
+            "device": device_id,
+            "name": interface_name,
+            "type": interface_type,
+        }
+        if not create_object("dcim/interfaces", interface_data, f"Interface '{interface_name}'"):
+            return False
+        existing_interfaces.append(interface_name)
+    return True
 
 
 def normalize_interface_name(interface_name):